@@ -1,12 +1,20 @@
 import streamlit as st
-import json
-import os
-import tempfile
-from google import genai
-from google.genai import types
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
+import diskcache
+import hashlib
+import hmac
+import orjson
+import re
+import threading
+import time
+from cachetools import TTLCache
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from tenacity import retry, retry_if_exception, stop_after_attempt, wait_exponential_jitter
+from PIL import Image, ImageOps
+from pydantic import BaseModel
 from io import BytesIO
+from operator import itemgetter
+from xml.sax.saxutils import escape
 
 # --- Configuration & Styles ---
 st.set_page_config(page_title="Voter ID Extractor", layout="wide")
@@ -15,84 +23,39 @@ st.set_page_config(page_title="Voter ID Extractor", layout="wide")
 DUMMY_USER = "admin"
 DUMMY_PASS = "password123"
 
-# --- Helper Functions ---
+# Pre-hashed at import; comparing fixed-length digests with compare_digest
+# keeps the login check constant-time regardless of what was typed.
+_USER_DIGEST = hashlib.sha256(DUMMY_USER.encode()).digest()
+_PASS_DIGEST = hashlib.sha256(DUMMY_PASS.encode()).digest()
 
-def clean_json_response(text):
-    """Cleans the raw text response from Gemini to ensure valid JSON."""
-    text = text.strip()
-    # Remove markdown code blocks if present
-    if text.startswith("```json"):
-        text = text[7:]
-    if text.startswith("```"):
-        text = text[3:]
-    if text.endswith("```"):
-        text = text[:-3]
-    return text.strip()
+MODEL_NAME = "gemini-2.5-flash"
+PROMPT_VERSION = b"v2"  # v2: constrained JSON output (response_schema)
 
-def create_pdf(json_data):
-    """Generates a PDF file from the JSON data."""
-    buffer = BytesIO()
-    c = canvas.Canvas(buffer, pagesize=letter)
-    width, height = letter
-    
-    c.setFont("Helvetica-Bold", 16)
-    c.drawString(50, height - 50, "Voter ID Extraction Report")
-    
-    c.setFont("Helvetica", 12)
-    y_position = height - 80
-    
-    for key, value in json_data.items():
-        # Format key for display (e.g., "election_number" -> "Election Number")
-        display_key = key.replace("_", " ").title()
-        text = f"{display_key}: {value}"
-        
-        # Simple text wrapping or truncation could be added here for very long lines
-        c.drawString(50, y_position, text)
-        y_position -= 20
-        
-        if y_position < 50: # New page if needed
-            c.showPage()
-            y_position = height - 50
-            
-    c.save()
-    buffer.seek(0)
-    return buffer
+# Images per Gemini request; larger uploads are split into batches of this
+# size and issued concurrently, with the per-batch JSON results merged.
+MAX_BATCH = 8
 
-def process_images(credential_file, image_files):
-    """Main logic to call Gemini API."""
-    try:
-        # 1. Setup Credentials
-        with tempfile.NamedTemporaryFile(delete=False, suffix=".json") as tmp_cred:
-            tmp_cred.write(credential_file.getvalue())
-            tmp_cred_path = tmp_cred.name
-        
-        os.environ['GOOGLE_APPLICATION_CREDENTIALS'] = tmp_cred_path
-        
-        # Initialize Client (Assuming Project ID is inside the JSON or env)
-        # We attempt to load the project ID from the JSON for robustness, 
-        # or rely on default google auth behavior
-        with open(tmp_cred_path, "r") as f:
-            creds = json.load(f)
-            project_id = creds.get("project_id") or creds.get("quota_project_id")
-
-        client = genai.Client(
-            vertexai=True,
-            project=project_id,
-            location="us-central1" 
-        )
+# Input limits enforced before any API work, so a bad upload fails in
+# milliseconds instead of after a billable multi-second round trip. The
+# downscaler copes with anything under the byte cap.
+MAX_IMAGES = 2
+MAX_IMAGE_BYTES = 25_000_000
 
-        # 2. Prepare Images
-        contents = []
-        for img_file in image_files:
-            image_bytes = img_file.getvalue()
-            image_part = types.Part.from_bytes(
-                data=image_bytes,
-                mime_type=img_file.type
-            )
-            contents.append(image_part)
+# Module-level so Streamlit reruns reuse it across sessions. Keyed on the
+# content hash of the uploaded images plus model/prompt version, so
+# re-uploading the same voter ID skips the multi-second Gemini round trip.
+# The on-disk layer behind it keeps hits alive across app restarts.
+# TTLCache is not thread-safe and is shared across session script threads
+# and the extraction workers, so all access goes through the lock
+# (diskcache handles its own locking).
+_GEMINI_CACHE = TTLCache(maxsize=256, ttl=600)
+_GEMINI_CACHE_LOCK = threading.Lock()
+_DISK_CACHE = diskcache.Cache(".gemini_cache", size_limit=2**30)
+_DISK_CACHE_TTL = 86400
 
-        # 3. Prepare Prompt (Copied from original script)
-        voter_id_extraction_prompt = '''
+# The extraction prompt is static; its types.Part wrapper is built once on
+# first use (lazily, so importing this module doesn't pull in the SDK).
+_VOTER_PROMPT = '''
         You are an expert OCR and document analysis specialist with deep knowledge of Indian electoral documents, including voter ID cards (EPIC - Elector's Photo Identity Card) issued by the Election Commission of India. You are highly skilled at extracting structured information from images containing text in multiple Indian languages including English, Hindi, Kannada, Telugu, Tamil, Malayalam, Bengali, Gujarati, Marathi, and others.
 
         ## Your Task
@@ -141,31 +104,308 @@ def process_images(credential_file, image_files):
         "issue_date": "21-04-2024"
         }
         '''
-        
-        contents.append(voter_id_extraction_prompt)
 
-        # 4. Generate Content
-        generate_config = types.GenerateContentConfig(
-            temperature=0,
-            max_output_tokens=4096
+@lru_cache(maxsize=1)
+def _voter_prompt_part():
+    """Builds the types.Part for the static prompt on first use."""
+    from google.genai import types
+    return types.Part.from_text(text=_VOTER_PROMPT)
+
+class VoterID(BaseModel):
+    """Extraction schema, enforced server-side via Gemini's constrained JSON decoding."""
+    election_number: str = ""
+    name: str = ""
+    relation_name: str = ""
+    gender: str = ""
+    date_of_birth: str = ""
+    address: str = ""
+    city: str = ""
+    state: str = ""
+    pincode: str = ""
+    electoral_registration_officer: str = ""
+    issue_date: str = ""
+
+# Field names in display order, derived from the schema so the form, PDF
+# and model output can never drift apart.
+_FIELDS = tuple(VoterID.model_fields)
+
+# --- Helper Functions ---
+
+# Matches an optional ```json ... ``` markdown fence around the payload.
+_FENCE_RE = re.compile(r"^\s*```(?:json)?\s*(.*?)\s*```\s*$", re.DOTALL)
+
+def clean_json_response(text):
+    """Cleans the raw text response from Gemini to ensure valid JSON."""
+    m = _FENCE_RE.match(text)
+    return (m.group(1) if m else text).strip()
+
+# Scratch buffer reused across PDF builds on the same thread; Streamlit's
+# script threads each get their own, so no locking is needed.
+_pdf_local = threading.local()
+
+# Display labels precomputed from the schema, so the PDF neither recomputes
+# replace().title() per call nor depends on the response dict's key order.
+_PDF_LABELS = tuple(key.replace("_", " ").title() for key in _FIELDS)
+
+@lru_cache(maxsize=1)
+def _pdf_styles():
+    """Static stylesheet and table style, built on the first PDF render."""
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import TableStyle
+    return getSampleStyleSheet(), TableStyle([
+        ("FONTNAME", (0, 0), (0, -1), "Helvetica-Bold"),
+        ("FONTSIZE", (0, 0), (-1, -1), 10),
+        ("VALIGN", (0, 0), (-1, -1), "TOP"),
+        ("BOTTOMPADDING", (0, 0), (-1, -1), 6),
+    ])
+
+@st.cache_data(show_spinner=False)
+def _render_pdf(values):
+    """Builds the PDF once per unique value tuple; reruns with the same data hit the cache."""
+    buffer = getattr(_pdf_local, "buf", None)
+    if buffer is None:
+        buffer = _pdf_local.buf = BytesIO()
+    from reportlab.lib.pagesizes import letter
+    from reportlab.platypus import Paragraph, SimpleDocTemplate, Table
+
+    buffer.seek(0)
+    buffer.truncate()
+    styles, table_style = _pdf_styles()
+    doc = SimpleDocTemplate(buffer, pagesize=letter, title="Voter ID Extraction Report")
+
+    # A single Table flowable handles text wrapping and page breaks in
+    # ReportLab's layout engine instead of a drawString-per-field loop.
+    # Fields the card didn't have stay out of the report entirely rather
+    # than rendering as blank rows.
+    # Paragraph parses its text as XML-ish markup, and these values are
+    # user-editable free text — escape them so tag-like input renders
+    # literally instead of crashing the paraparser.
+    rows = [
+        [label, Paragraph(escape(str(value)), styles["BodyText"])]
+        for label, value in zip(_PDF_LABELS, values)
+        if value not in ("", None)
+    ]
+
+    flowables = [Paragraph("Voter ID Extraction Report", styles["Title"])]
+    if rows:
+        flowables.append(Table(rows, colWidths=[150, 350], style=table_style))
+    doc.build(flowables)
+    return buffer.getvalue()
+
+# Pulls all schema values out of a defaulted dict in one C-level call.
+_VALUES_GETTER = itemgetter(*_FIELDS)
+
+def create_pdf(json_data):
+    """Generates the PDF for the given data, returned as immutable bytes."""
+    defaulted = {key: json_data.get(key, "") for key in _FIELDS}
+    return _render_pdf(_VALUES_GETTER(defaulted))
+
+@st.cache_resource(show_spinner=False)
+def get_genai_client(cred_bytes):
+    """Builds the genai Client once per credential file and reuses it across reruns."""
+    from google import genai
+    from google.oauth2 import service_account
+
+    # Credentials are handed to the client directly instead of round-tripping
+    # through a temp file and GOOGLE_APPLICATION_CREDENTIALS.
+    info = orjson.loads(cred_bytes)
+    project_id = info.get("project_id") or info.get("quota_project_id")
+    creds = service_account.Credentials.from_service_account_info(
+        info, scopes=["https://www.googleapis.com/auth/cloud-platform"]
+    )
+
+    return genai.Client(
+        vertexai=True,
+        project=project_id,
+        location="us-central1",
+        credentials=creds
+    )
+
+# Uploads larger than this get downscaled/recompressed before the API call;
+# Gemini OCR gains nothing from phone-camera resolutions past ~1600 px.
+_MAX_UPLOAD_BYTES = 1_500_000
+_MAX_IMAGE_EDGE = 1600
+
+def _image_digest(image_bytes):
+    """Cache-key digest for uploaded image bytes."""
+    return hashlib.blake2b(image_bytes, digest_size=16).digest()
+
+def _prep_image(image_bytes, mime_type):
+    """Recompresses oversized uploads to a bounded JPEG; small files pass through."""
+    if len(image_bytes) <= _MAX_UPLOAD_BYTES:
+        return image_bytes, mime_type
+    im = Image.open(BytesIO(image_bytes))
+    # Bake in the EXIF orientation so recompression doesn't hand Gemini a
+    # sideways card, then downscale with a proper resampling filter.
+    im = ImageOps.exif_transpose(im)
+    im.thumbnail((_MAX_IMAGE_EDGE, _MAX_IMAGE_EDGE), Image.LANCZOS)
+    out = BytesIO()
+    im.convert("RGB").save(out, "JPEG", quality=85, optimize=True)
+    return out.getvalue(), "image/jpeg"
+
+def _is_retryable(exc):
+    """Rate limits and transient server errors are worth retrying; other API errors are not."""
+    from google.genai import errors as genai_errors
+    return isinstance(exc, genai_errors.APIError) and exc.code in (429, 500, 503, 504)
+
+@retry(
+    retry=retry_if_exception(_is_retryable),
+    wait=wait_exponential_jitter(initial=1, max=30),
+    stop=stop_after_attempt(6),
+    reraise=True,
+)
+def _stream_generate(client, contents, config, progress=None):
+    """Runs one streamed generate_content call and returns the joined text.
+
+    Retries 429/5xx responses with exponential backoff and jitter so a
+    transient quota blip doesn't force the user to re-upload and resubmit.
+    """
+    chunks = []
+    received = 0
+    for event in client.models.generate_content_stream(
+        model=MODEL_NAME,
+        contents=contents,
+        config=config
+    ):
+        if event.text:
+            chunks.append(event.text)
+            received += len(event.text)
+            if progress is not None:
+                progress(received)
+    return "".join(chunks)
+
+def _parses_as_json(text):
+    """True if the response text (fenced or not) decodes as JSON."""
+    stripped = text.lstrip()
+    candidate = stripped if stripped.startswith("{") else clean_json_response(text)
+    try:
+        orjson.loads(candidate)
+    except orjson.JSONDecodeError:
+        return False
+    return True
+
+def _merge_responses(texts):
+    """Merges per-batch JSON responses field-by-field, preferring non-empty values."""
+    merged = {}
+    for text in texts:
+        try:
+            data = orjson.loads(clean_json_response(text))
+        except orjson.JSONDecodeError:
+            continue
+        for key, value in data.items():
+            if not merged.get(key):
+                merged[key] = value
+    return orjson.dumps(merged).decode()
+
+@st.cache_data(show_spinner=False)
+def _thumb(_img_file, cache_key):
+    """Small JPEG preview; cached so reruns don't re-serve the full upload.
+
+    The file handle is underscore-prefixed so Streamlit keys the cache on
+    ``cache_key`` (upload id + size) instead of copying and hashing the
+    full image bytes on every rerun.
+    """
+    _img_file.seek(0)
+    im = Image.open(_img_file)
+    im.thumbnail((400, 400))
+    out = BytesIO()
+    im.convert("RGB").save(out, "JPEG", quality=70)
+    return out.getvalue()
+
+def process_images(credential_file, image_files, progress=None):
+    """Main logic to call Gemini API.
+
+    Runs on a worker thread (see main_app), so it must not touch Streamlit
+    elements; errors propagate to the caller through the future.
+    ``progress`` is an optional callable receiving the number of response
+    characters streamed so far.
+    """
+    # 0. Fail fast on invalid input; the UI validates too, but this guard
+    # keeps direct callers from paying for a doomed request.
+    if not image_files or len(image_files) > MAX_IMAGES:
+        raise ValueError(f"Expected 1 to {MAX_IMAGES} images, got {len(image_files)}")
+    for img_file in image_files:
+        if img_file.size > MAX_IMAGE_BYTES:
+            raise ValueError(
+                f"{img_file.name} is {img_file.size:,} bytes; "
+                f"the limit is {MAX_IMAGE_BYTES:,}"
+            )
+
+    from google.genai import types
+
+    # 1. Setup Client (cached across reruns, so auth/TLS setup runs once)
+    client = get_genai_client(credential_file.getvalue())
+
+    # 2. Prepare Images (byte copies and hashing overlap across files)
+    def _to_part(img_file):
+        raw_bytes = img_file.getvalue()
+        # Key the cache on the original upload; _prep_image is deterministic.
+        digest = _image_digest(raw_bytes)
+        image_bytes, mime_type = _prep_image(raw_bytes, img_file.type)
+        return digest, types.Part.from_bytes(
+            data=image_bytes,
+            mime_type=mime_type
         )
 
-        response = client.models.generate_content(
-            model="gemini-2.5-flash",
-            contents=contents,
-            config=generate_config
+    if len(image_files) > 1:
+        with ThreadPoolExecutor(max_workers=len(image_files)) as pool:
+            prepared = list(pool.map(_to_part, image_files))
+    else:
+        prepared = [_to_part(f) for f in image_files]
+    image_hashes = [digest for digest, _ in prepared]
+    contents = [part for _, part in prepared]
+
+    cache_key = hashlib.blake2b(
+        b"".join(sorted(image_hashes)) + MODEL_NAME.encode() + PROMPT_VERSION
+    ).hexdigest()
+    with _GEMINI_CACHE_LOCK:
+        cached = _GEMINI_CACHE.get(cache_key)
+    if cached is None:
+        cached = _DISK_CACHE.get(cache_key)
+        if cached is not None:
+            with _GEMINI_CACHE_LOCK:
+                _GEMINI_CACHE[cache_key] = cached
+    if cached is not None:
+        return cached
+
+    # 3. Generate Content. Constrained decoding guarantees parseable JSON
+    # matching VoterID, so no markdown fence is generated (or paid for).
+    generate_config = types.GenerateContentConfig(
+        temperature=0,
+        max_output_tokens=1024,
+        response_mime_type="application/json",
+        response_schema=VoterID
+    )
+
+    batches = [
+        contents[i:i + MAX_BATCH] for i in range(0, len(contents), MAX_BATCH)
+    ]
+    if len(batches) == 1:
+        response_text = _stream_generate(
+            client, batches[0] + [_voter_prompt_part()], generate_config, progress
         )
+    else:
+        # Fan the batches out concurrently so total latency approaches the
+        # slowest single request instead of the sum. Progress callbacks
+        # stay on the script thread, so they are skipped here.
+        with ThreadPoolExecutor(max_workers=len(batches)) as pool:
+            texts = list(pool.map(
+                lambda batch: _stream_generate(
+                    client, batch + [_voter_prompt_part()], generate_config
+                ),
+                batches
+            ))
+        response_text = _merge_responses(texts)
 
-        # Cleanup
-        os.unlink(tmp_cred_path)
-        
-        return response.text
+    # Only cache responses that actually parse; a truncated or malformed
+    # payload would otherwise be replayed from cache on every retry until
+    # it expired, with no way to recover from the UI.
+    if _parses_as_json(response_text):
+        with _GEMINI_CACHE_LOCK:
+            _GEMINI_CACHE[cache_key] = response_text
+        _DISK_CACHE.set(cache_key, response_text, expire=_DISK_CACHE_TTL)
 
-    except Exception as e:
-        st.error(f"An error occurred: {str(e)}")
-        if os.path.exists(tmp_cred_path):
-            os.unlink(tmp_cred_path)
-        return None
+    return response_text
 
 # --- Application Flow ---
 
@@ -177,12 +417,60 @@ def login_screen():
         submit = st.form_submit_button("Login")
         
         if submit:
-            if username == DUMMY_USER and password == DUMMY_PASS:
+            user_ok = hmac.compare_digest(
+                hashlib.sha256(username.encode()).digest(), _USER_DIGEST
+            )
+            pass_ok = hmac.compare_digest(
+                hashlib.sha256(password.encode()).digest(), _PASS_DIGEST
+            )
+            # Bitwise & so both checks always run (no short-circuit timing leak)
+            if user_ok & pass_ok:
                 st.session_state.logged_in = True
                 st.rerun()
             else:
                 st.error("Invalid credentials")
 
+@st.fragment
+def _render_edit_form():
+    """Editable view of the extracted fields.
+
+    Runs as a fragment so editing a field reruns only this block instead of
+    the whole script (uploaders, credential handling, layout above).
+    """
+    data = st.session_state.extracted_data
+
+    st.subheader("Extracted Details")
+    # The form batches widget state, so typing in a field no longer triggers
+    # a rerun per keystroke; everything lands in one rerun on Save.
+    values = {key: data.get(key, "") for key in _FIELDS}
+    with st.form("edit_voter_form"):
+        cols = st.columns(2)
+        edited = {}
+        for i, key in enumerate(_FIELDS):
+            display_key = key.replace("_", " ").title()
+            edited[key] = cols[i % 2].text_input(
+                display_key, value=str(values[key]), key=f"field_{key}"
+            )
+        saved = st.form_submit_button("Save Changes")
+
+    if saved:
+        st.session_state.extracted_data = edited
+        data = edited
+
+    # Only regenerate (and re-hash) the PDF payload when the saved data
+    # actually changed; unrelated reruns reuse the bytes in session state.
+    slot = st.empty()
+    sig = hash(tuple(sorted(data.items())))
+    if st.session_state.get("_pdf_sig") != sig:
+        st.session_state._pdf_bytes = create_pdf(data)
+        st.session_state._pdf_sig = sig
+    slot.download_button(
+        label="Download as PDF",
+        data=st.session_state._pdf_bytes,
+        file_name="voter_id_card.pdf",
+        mime="application/pdf"
+    )
+
 def main_app():
     st.title("Voter ID Information Extractor")
     st.write(f"Welcome, {DUMMY_USER}")
@@ -202,46 +490,92 @@ def main_app():
     with col2:
         st.subheader("2. Upload Voter ID Images")
         uploaded_images = st.file_uploader(
-            "Upload Front and Back images (Max 2)", 
-            type=['jpg', 'jpeg', 'png'], 
+            "Upload Front and Back images (Max 2)",
+            type=['jpg', 'jpeg', 'png'],
             accept_multiple_files=True
         )
+        if uploaded_images:
+            with st.expander("Preview Images"):
+                for img_file in uploaded_images:
+                    st.image(
+                        _thumb(img_file, (img_file.file_id, img_file.size)),
+                        caption=img_file.name
+                    )
 
     start_process = st.button("Start Extraction Process", type="primary")
 
     if start_process:
         if not cred_file:
             st.warning("Please upload the credential JSON file.")
-        elif not uploaded_images or len(uploaded_images) > 2:
-            st.warning("Please upload exactly 1 or 2 images.")
+        elif not uploaded_images or len(uploaded_images) > MAX_IMAGES:
+            st.warning(f"Please upload exactly 1 or {MAX_IMAGES} images.")
+        elif any(f.size > MAX_IMAGE_BYTES for f in uploaded_images):
+            sizes = ", ".join(
+                f"{f.name} ({f.size:,} bytes)"
+                for f in uploaded_images if f.size > MAX_IMAGE_BYTES
+            )
+            st.warning(f"Image(s) exceed the {MAX_IMAGE_BYTES:,} byte limit: {sizes}")
+        elif "extract_future" in st.session_state:
+            st.warning("An extraction is already in progress.")
+        elif (st.session_state.get("last_extract_key")
+                == tuple(_image_digest(f.getvalue()) for f in uploaded_images)
+                and st.session_state.get("extracted_data")):
+            # Same images as the result already on screen — nothing to do.
+            st.info("These images are already extracted below.")
         else:
-            with st.spinner("Processing images with Gemini..."):
-                raw_response = process_images(cred_file, uploaded_images)
-                
-                if raw_response:
+            # Run the Gemini round trip on a worker thread so the script
+            # returns immediately and the tab stays responsive; the polling
+            # block below picks the result up via session state.
+            if "extract_pool" not in st.session_state:
+                st.session_state.extract_pool = ThreadPoolExecutor(max_workers=4)
+            tracker = {"chars": 0}
+            st.session_state.extract_progress = tracker
+            st.session_state.pending_extract_key = tuple(
+                _image_digest(f.getvalue()) for f in uploaded_images
+            )
+            st.session_state.extract_future = st.session_state.extract_pool.submit(
+                process_images, cred_file, uploaded_images,
+                progress=lambda n: tracker.update(chars=n)
+            )
+
+    future = st.session_state.get("extract_future")
+    if future is not None:
+        if not future.done():
+            st.caption(
+                "Processing images with Gemini... "
+                f"{st.session_state.extract_progress['chars']} characters received"
+            )
+            time.sleep(0.5)
+            st.rerun()
+        else:
+            del st.session_state["extract_future"]
+            try:
+                raw_response = future.result()
+            except Exception as e:
+                st.error(f"An error occurred: {str(e)}")
+                raw_response = None
+
+            if raw_response:
+                # With constrained JSON output the response is already clean;
+                # only scan for markdown fences when it isn't.
+                stripped = raw_response.lstrip()
+                if stripped.startswith("{"):
+                    cleaned_text = stripped
+                else:
                     cleaned_text = clean_json_response(raw_response)
-                    try:
-                        json_data = json.loads(cleaned_text)
-                        
-                        st.success("Extraction Complete!")
-                        
-                        # Display Data in User Friendly Form
-                        st.subheader("Extracted Details")
-                        st.json(json_data)
-                        
-                        # Generate PDF
-                        pdf_buffer = create_pdf(json_data)
-                        
-                        st.download_button(
-                            label="Download as PDF",
-                            data=pdf_buffer,
-                            file_name="voter_id_card.pdf",
-                            mime="application/pdf"
-                        )
-                        
-                    except json.JSONDecodeError:
-                        st.error("Failed to parse the response as JSON.")
-                        st.text_area("Raw Response", raw_response)
+                try:
+                    st.session_state.extracted_data = orjson.loads(cleaned_text)
+                    st.session_state.last_extract_key = st.session_state.pop(
+                        "pending_extract_key", None
+                    )
+                    st.success("Extraction Complete!")
+                except orjson.JSONDecodeError:
+                    st.error("Failed to parse the response as JSON.")
+                    st.text_area("Raw Response", raw_response)
+
+    # Display Form if Data Exists (survives reruns via session state)
+    if st.session_state.get("extracted_data"):
+        _render_edit_form()
 
 # --- Entry Point ---
 